@@ -0,0 +1,102 @@
+"""
+Numba-compiled statevector kernels for the small circuits in this project.
+
+Each kernel updates a complex128 statevector of length 2**n in place using
+Qiskit's little-endian qubit ordering. Compilation is opt-in: Numba is only
+imported when QUANTUM_JIT=1 is set before this module is imported, because
+its import and per-process JIT load cost more than simulating the 1-3 qubit
+circuits used here. Otherwise the kernels run as plain Python and
+HAVE_NUMBA is False.
+"""
+
+import math
+import os
+
+import numpy as np
+
+HAVE_NUMBA = False
+if os.environ.get("QUANTUM_JIT") == "1":
+    try:
+        from numba import njit
+        HAVE_NUMBA = True
+    except ImportError:
+        pass
+
+if not HAVE_NUMBA:
+    def njit(*args, **kwargs):
+        """Stand-in for numba.njit that returns the function unchanged."""
+        def decorator(func):
+            return func
+        return decorator
+
+
+_INV_SQRT2 = 1.0 / math.sqrt(2.0)
+
+
+@njit(cache=True)
+def apply_h(state, q, n):
+    """Apply a Hadamard gate to qubit q."""
+    bit = 1 << q
+    for i in range(1 << n):
+        if i & bit == 0:
+            j = i | bit
+            a = state[i]
+            b = state[j]
+            state[i] = (a + b) * _INV_SQRT2
+            state[j] = (a - b) * _INV_SQRT2
+
+
+@njit(cache=True)
+def apply_x(state, q, n):
+    """Apply a Pauli-X gate to qubit q."""
+    bit = 1 << q
+    for i in range(1 << n):
+        if i & bit == 0:
+            j = i | bit
+            a = state[i]
+            state[i] = state[j]
+            state[j] = a
+
+
+@njit(cache=True)
+def apply_z(state, q, n):
+    """Apply a Pauli-Z gate to qubit q."""
+    bit = 1 << q
+    for i in range(1 << n):
+        if i & bit:
+            state[i] = -state[i]
+
+
+@njit(cache=True)
+def apply_cx(state, control, target, n):
+    """Apply a CNOT gate with the given control and target qubits."""
+    cbit = 1 << control
+    tbit = 1 << target
+    for i in range(1 << n):
+        if i & cbit and i & tbit == 0:
+            j = i | tbit
+            a = state[i]
+            state[i] = state[j]
+            state[j] = a
+
+
+@njit(cache=True)
+def apply_cz(state, control, target, n):
+    """Apply a controlled-Z gate between two qubits."""
+    mask = (1 << control) | (1 << target)
+    for i in range(1 << n):
+        if i & mask == mask:
+            state[i] = -state[i]
+
+
+@njit(cache=True)
+def apply_unitary(state, matrix):
+    """Apply a unitary acting on every qubit (qubit 0 least significant)."""
+    dim = state.shape[0]
+    out = np.zeros(dim, dtype=np.complex128)
+    for i in range(dim):
+        acc = 0j
+        for j in range(dim):
+            acc += matrix[i, j] * state[j]
+        out[i] = acc
+    state[:] = out
@@ -13,9 +13,9 @@ from quantum_experiments import (
     visualize_circuit_example,
 )
 from quantum_utils import (
-    create_bell_state,
-    create_superposition_state,
+    BELL_STATES,
     print_statevector,
+    superposition_statevector,
 )
 from qiskit.quantum_info import Statevector
 
@@ -42,12 +42,10 @@ def example_3_custom_bell_state():
     print("EXAMPLE 3: Custom Bell State Analysis")
     print("=" * 60)
     
-    # Create different Bell states
-    for variant in ['phi_plus', 'phi_minus', 'psi_plus', 'psi_minus']:
+    # The four Bell states are known analytically, so no circuit is simulated
+    for variant, amplitudes in BELL_STATES.items():
         print(f"\n{variant.upper()} Bell State:")
-        qc = create_bell_state(variant)
-        sv = Statevector.from_instruction(qc)
-        print_statevector(sv)
+        print_statevector(Statevector(amplitudes))
 
 
 def example_4_superposition():
@@ -58,8 +56,7 @@ def example_4_superposition():
     
     for n in [2, 3, 4]:
         print(f"\n{n}-qubit equal superposition:")
-        qc = create_superposition_state(n)
-        sv = Statevector.from_instruction(qc)
+        sv = superposition_statevector(n)
         print_statevector(sv, threshold=0.1)
 
 
@@ -10,25 +10,240 @@ This module contains various quantum computing experiments including:
 
 from qiskit import QuantumCircuit, transpile
 from qiskit.visualization import plot_histogram, plot_bloch_multivector
+from qiskit.circuit.library import UnitaryGate, get_standard_gate_name_mapping
 from qiskit.primitives import StatevectorSampler
 from qiskit.quantum_info import Statevector
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+import argparse
+import io
+import itertools
+import os
+import matplotlib
 import matplotlib.pyplot as plt
 import numpy as np
+from _jit_kernels import HAVE_NUMBA
+from quantum_utils import (
+    _HMAT,
+    _fast_histogram,
+    apply_h_layer,
+    simplify_circuit,
+    simulate_native,
+    supports_native,
+)
 
 
-def run_circuit_sampler(qc, shots=1000):
+# Shared sampler for circuits the direct Statevector path does not cover
+# (classical bits no measurement writes to).
+_SAMPLER = StatevectorSampler()
+
+
+# Statevector amplitudes keyed by circuit fingerprint, oldest entries evicted first
+_SV_CACHE = OrderedDict()
+_SV_CACHE_SIZE = 64
+
+
+# Instructions whose behaviour is fully determined by name, params and wires
+_STANDARD_OPERATIONS = get_standard_gate_name_mapping()
+
+
+def _operation_key(op):
     """
-    Run a quantum circuit using StatevectorSampler.
-    
+    Describe an operation for a cache key, if its name and params define it.
+
     Args:
-        qc: QuantumCircuit to execute
+        op: Operation from a circuit instruction
+
+    Returns:
+        Tuple of (name, params), or None for custom gates and operations
+        whose behaviour is not captured by plain numeric params
+    """
+    if isinstance(op, UnitaryGate):
+        matrix = op.params[0]
+        return (op.name, (matrix.shape, matrix.tobytes()))
+    if op.name == 'barrier':
+        return (op.name, ())
+    standard = _STANDARD_OPERATIONS.get(op.name)
+    if standard is None or op.base_class is not standard.base_class:
+        return None
+    if not all(isinstance(p, (int, float, complex, np.number)) for p in op.params):
+        return None
+    return (op.name, tuple(op.params))
+
+
+def _circuit_fingerprint(qc):
+    """
+    Build a hashable key that identifies a circuit's gate sequence.
+
+    Args:
+        qc: QuantumCircuit to fingerprint
+
+    Returns:
+        Tuple of qubit and clbit counts, global phase and
+        (name, params, qubits, clbits) entries, or None if the circuit
+        contains an operation that cannot be keyed safely
+    """
+    if not isinstance(qc.global_phase, (int, float)):
+        return None
+    ops = []
+    for instruction in qc.data:
+        op_key = _operation_key(instruction.operation)
+        if op_key is None:
+            return None
+        qubits = tuple(qc.find_bit(q).index for q in instruction.qubits)
+        clbits = tuple(qc.find_bit(c).index for c in instruction.clbits)
+        ops.append(op_key + (qubits, clbits))
+    return (qc.num_qubits, qc.num_clbits, qc.global_phase, tuple(ops))
+
+
+# Optimised circuits keyed by the fingerprint of the circuit they came from,
+# oldest entries evicted first
+_TRANSPILE_CACHE = OrderedDict()
+_TRANSPILE_CACHE_SIZE = 64
+
+
+def _transpiled(qc):
+    """
+    Transpile a circuit to u/cx with optimization_level=3, once per circuit.
+
+    Circuits that cannot be fingerprinted are transpiled every time.
+
+    Args:
+        qc: QuantumCircuit to optimise
+
+    Returns:
+        Equivalent transpiled QuantumCircuit
+    """
+    key = _circuit_fingerprint(qc)
+    if key is None:
+        return transpile(qc, basis_gates=['u', 'cx'], optimization_level=3)
+    qc_opt = _TRANSPILE_CACHE.get(key)
+    if qc_opt is None:
+        qc_opt = transpile(qc, basis_gates=['u', 'cx'], optimization_level=3)
+        _TRANSPILE_CACHE[key] = qc_opt
+        if len(_TRANSPILE_CACHE) > _TRANSPILE_CACHE_SIZE:
+            _TRANSPILE_CACHE.popitem(last=False)
+    else:
+        _TRANSPILE_CACHE.move_to_end(key)
+    return qc_opt
+
+
+def _cached_statevector(qc):
+    """
+    Simulate a measurement-free circuit, reusing earlier results.
+
+    Circuits containing custom or otherwise unkeyable operations are
+    simulated every time.
+
+    Adjacent self-inverse gate pairs are cancelled before a new circuit is
+    simulated. Circuits made only of H, X, Z, CX, CZ and full-register
+    unitaries use the compiled kernels when QUANTUM_JIT=1 is set and Numba
+    is installed.
+
+    Args:
+        qc: QuantumCircuit without measurements
+
+    Returns:
+        Statevector of the circuit
+    """
+    key = _circuit_fingerprint(qc)
+    data = None if key is None else _SV_CACHE.get(key)
+    if data is None:
+        simplified = simplify_circuit(qc)
+        if HAVE_NUMBA and supports_native(simplified):
+            data = simulate_native(simplified).data
+        else:
+            data = Statevector.from_instruction(simplified).data
+        if key is None:
+            return Statevector(data)
+        _SV_CACHE[key] = data
+        if len(_SV_CACHE) > _SV_CACHE_SIZE:
+            _SV_CACHE.popitem(last=False)
+    else:
+        _SV_CACHE.move_to_end(key)
+    return Statevector(data.copy())
+
+
+def _has_only_final_measurements(qc):
+    """
+    Check whether every measurement in a circuit is terminal.
+
+    Args:
+        qc: QuantumCircuit to inspect
+
+    Returns:
+        True if no instruction acts on a qubit after it has been measured
+    """
+    measured = set()
+    for instruction in qc.data:
+        name = instruction.operation.name
+        if name == 'barrier':
+            continue
+        if name != 'measure' and instruction.clbits:
+            return False
+        if measured.intersection(instruction.qubits):
+            return False
+        if name == 'measure':
+            measured.update(instruction.qubits)
+    return True
+
+
+def _measured_qargs(qc):
+    """
+    Find which qubit is read into each classical bit.
+
+    Args:
+        qc: QuantumCircuit to inspect
+
+    Returns:
+        List of qubit indices ordered by classical bit, or None if some
+        classical bit is never written by a measurement
+    """
+    mapping = {}
+    for instruction in qc.data:
+        if instruction.operation.name == 'measure':
+            qubit = qc.find_bit(instruction.qubits[0]).index
+            clbit = qc.find_bit(instruction.clbits[0]).index
+            mapping[clbit] = qubit
+    if sorted(mapping) != list(range(qc.num_clbits)):
+        return None
+    return [mapping[clbit] for clbit in range(qc.num_clbits)]
+
+
+# Pre-formatted basis-state labels for registers of up to 8 qubits
+_BITSTRING_LUT = {n: [format(i, f'0{n}b') for i in range(1 << n)] for n in range(1, 9)}
+
+
+def _sample_all_qubits(sv, shots):
+    """
+    Draw every shot at once from the full measurement distribution.
+
+    Args:
+        sv: Statevector to sample
         shots: Number of measurement shots
-    
+
     Returns:
-        Dictionary of measurement counts
+        Dictionary of measurement counts over all qubits
     """
-    sampler = StatevectorSampler()
-    job = sampler.run([qc], shots=shots)
+    n = sv.num_qubits
+    probs = np.abs(sv.data) ** 2
+    probs /= probs.sum()
+    samples = np.random.multinomial(shots, probs)
+    labels = _BITSTRING_LUT.get(n)
+    if labels is None:
+        return {format(i, f'0{n}b'): int(c) for i, c in enumerate(samples) if c}
+    return {labels[i]: int(c) for i, c in enumerate(samples) if c}
+
+
+def _is_measurement_free(qc):
+    """Return True if the circuit contains no measure instructions."""
+    return all(instruction.operation.name != 'measure' for instruction in qc.data)
+
+
+def _run_sampler_primitive(qc, shots):
+    """Sample a circuit with the shared StatevectorSampler."""
+    job = _SAMPLER.run([_transpiled(qc)], shots=shots)
     result = job.result()
     
     # Extract counts from the BitArray
@@ -37,6 +252,89 @@ def run_circuit_sampler(qc, shots=1000):
     return counts
 
 
+def run_circuit_sampler_with_sv(qc, shots=1000):
+    """
+    Run a quantum circuit and return both the counts and its statevector.
+
+    Circuits without measurements have every qubit sampled. Circuits whose
+    measurements are all at the end and fill every classical bit are
+    simulated once as a Statevector and sampled directly; circuits that
+    leave classical bits unwritten fall back to the StatevectorSampler
+    primitive.
+    
+    Args:
+        qc: QuantumCircuit to execute
+        shots: Number of measurement shots
+    
+    Returns:
+        Tuple of (counts dictionary, Statevector of the circuit without its
+        final measurements)
+    
+    Raises:
+        ValueError: If a qubit is acted on after being measured
+    """
+    if _is_measurement_free(qc):
+        sv = _cached_statevector(qc)
+        return _sample_all_qubits(sv, shots), sv
+    if not _has_only_final_measurements(qc):
+        raise ValueError("Mid-circuit measurements are not supported")
+
+    sv = _cached_statevector(qc.remove_final_measurements(inplace=False))
+    qargs = _measured_qargs(qc)
+    if not qargs:
+        return _run_sampler_primitive(qc, shots), sv
+    if qargs == list(range(qc.num_qubits)):
+        return _sample_all_qubits(sv, shots), sv
+    # Only the measured qubits enter the sampled distribution
+    counts = sv.sample_counts(shots, qargs=qargs)
+    return {str(key): int(value) for key, value in counts.items()}, sv
+
+
+def run_circuit_sampler(qc, shots=1000):
+    """
+    Run a quantum circuit and sample measurement outcomes.
+    
+    Args:
+        qc: QuantumCircuit to execute
+        shots: Number of measurement shots
+    
+    Returns:
+        Dictionary of measurement counts
+    """
+    counts, _ = run_circuit_sampler_with_sv(qc, shots=shots)
+    return counts
+
+
+# Numbering for figures saved to QUANTUM_FIGDIR instead of being shown
+_FIGURE_NUMBERS = itertools.count(1)
+
+
+def _show_histogram(counts, title=None, display=True):
+    """
+    Plot measurement counts as a histogram and show the figure.
+
+    Nothing is drawn when display is False or the QUANTUM_NOPLOT environment
+    variable is "1", so batch and test runs never touch matplotlib. When
+    QUANTUM_FIGDIR is set the figure is saved there as a PNG instead of shown.
+
+    Args:
+        counts: Dictionary of measurement counts
+        title: Optional plot title
+        display: Whether to plot at all
+    """
+    if not display or os.environ.get("QUANTUM_NOPLOT") == "1":
+        return
+    fig = _fast_histogram(counts, title)
+
+    fig_dir = os.environ.get("QUANTUM_FIGDIR")
+    if fig_dir:
+        os.makedirs(fig_dir, exist_ok=True)
+        fig.savefig(os.path.join(fig_dir, f"{next(_FIGURE_NUMBERS):02d}.png"))
+        plt.close(fig)
+    else:
+        plt.show()
+
+
 def basic_hadamard_measurement():
     """Demonstrates a basic Hadamard gate followed by measurement."""
     print("--- Basic Hadamard Measurement ---")
@@ -46,9 +344,7 @@ def basic_hadamard_measurement():
 
     counts = run_circuit_sampler(qc, shots=1000)
     print("Measurement counts:", counts)
-    plot_histogram(counts)
-    plt.title("Single Qubit Hadamard Measurement")
-    plt.show()
+    _show_histogram(counts, "Single Qubit Hadamard Measurement")
 
 
 def two_qubit_measurement():
@@ -61,9 +357,7 @@ def two_qubit_measurement():
 
     counts = run_circuit_sampler(qc, shots=1000)
     print("Measurement counts:", counts)
-    plot_histogram(counts)
-    plt.title("Two Qubit Hadamard Measurement")
-    plt.show()
+    _show_histogram(counts, "Two Qubit Hadamard Measurement")
 
 
 def single_qubit_h_h_measurement():
@@ -77,38 +371,48 @@ def single_qubit_h_h_measurement():
     counts = run_circuit_sampler(qc, shots=1000)
     print("Measurement counts:", counts)
     print("Expected: Should measure |0> with ~100% probability (H*H = Identity)")
-    plot_histogram(counts)
-    plt.title("Single Qubit H-H Measurement")
-    plt.show()
+    _show_histogram(counts, "Single Qubit H-H Measurement")
 
 
-def run_and_print(qc, shots=1024, show_statevector=False):
+def _print_amplitudes(sv, width, threshold=1e-10):
+    """
+    Print the non-zero amplitudes of a statevector, one basis state per line.
+
+    Args:
+        sv: Statevector to display
+        width: Number of bits used for the basis-state labels
+        threshold: Minimum amplitude magnitude to display
+    """
+    data = np.asarray(sv.data)
+    idx = np.nonzero(np.abs(data) > threshold)[0]
+    if len(idx):
+        print("\n".join(f"{i:0{width}b} -> {amp}" for i, amp in zip(idx, data[idx])))
+
+
+def run_and_print(qc, shots=1024, show_statevector=False, display=True):
     """
     Helper function to run quantum circuit and print results.
     
     Args:
-        qc: QuantumCircuit to execute
-        shots: Number of measurement shots
+        qc: QuantumCircuit to execute; if it has no measurements, every
+            qubit is measured
+        shots: Number of measurement shots (0 skips sampling)
         show_statevector: Whether to display statevector amplitudes
+        display: Whether to plot the counts histogram
     
     Returns:
         Statevector if show_statevector=True, None otherwise
     """
     if shots > 0:
-        counts = run_circuit_sampler(qc, shots=shots)
+        counts, sv = run_circuit_sampler_with_sv(qc, shots=shots)
         print("Counts:", counts)
-        plot_histogram(counts)
-        plt.show()
+        _show_histogram(counts, display=display)
+    else:
+        sv = _cached_statevector(qc.remove_final_measurements(inplace=False))
 
     if show_statevector:
-        # Create circuit without measurements for statevector
-        qc_no_meas = qc.remove_final_measurements(inplace=False)
-        sv = Statevector.from_instruction(qc_no_meas)
-        
         print("Statevector amplitudes (index -> amplitude):")
-        for i, amp in enumerate(sv.data):
-            if abs(amp) > 1e-10:  # Only show non-zero amplitudes
-                print(f"{i:03b} -> {amp}")
+        _print_amplitudes(sv, 3)
         return sv
     return None
 
@@ -117,73 +421,58 @@ def ghz_experiments():
     """GHZ state experiments with different measurement bases."""
     print("\n--- GHZ + Hadamard Interference ---")
     
-    # GHZ state measured in computational (Z) basis
-    qc_ghz = QuantumCircuit(3, 3)
-    qc_ghz.h(0)       # H on qubit 0
-    qc_ghz.cx(0, 1)   # entangle q0->q1
-    qc_ghz.cx(0, 2)   # entangle q0->q2
-    qc_ghz.measure([0, 1, 2], [0, 1, 2])
+    # GHZ preparation shared by every variant below (no measurements)
+    qc_ghz_core = QuantumCircuit(3)
+    qc_ghz_core.h(0)       # H on qubit 0
+    qc_ghz_core.cx(0, 1)   # entangle q0->q1
+    qc_ghz_core.cx(0, 2)   # entangle q0->q2
 
+    # GHZ state measured in computational (Z) basis
     print("=== GHZ state measured in computational (Z) basis ===")
     print("Expected: Only |000> and |111> states")
-    run_and_print(qc_ghz, shots=2048, show_statevector=False)
+    run_and_print(qc_ghz_core, shots=2048, show_statevector=False)
 
     # GHZ statevector (no measurements)
-    qc_ghz_sv = QuantumCircuit(3)
-    qc_ghz_sv.h(0)
-    qc_ghz_sv.cx(0, 1)
-    qc_ghz_sv.cx(0, 2)
     print("\n=== GHZ statevector (amplitudes) ===")
-    sv = run_and_print(qc_ghz_sv, shots=0, show_statevector=True)
+    sv = run_and_print(qc_ghz_core, shots=0, show_statevector=True)
 
     # GHZ measured in X basis
-    qc_ghz_in_x = QuantumCircuit(3, 3)
-    qc_ghz_in_x.h(0)
-    qc_ghz_in_x.cx(0, 1)
-    qc_ghz_in_x.cx(0, 2)
-    qc_ghz_in_x.h([0, 1, 2])
-    qc_ghz_in_x.measure([0, 1, 2], [0, 1, 2])
+    qc_ghz_in_x = qc_ghz_core.copy()
+    apply_h_layer(qc_ghz_in_x, 3)
 
     print("\n=== GHZ measured in X basis (H on each qubit before measurement) ===")
     run_and_print(qc_ghz_in_x, shots=2048)
 
     # GHZ with phase
-    qc_ghz_phase = QuantumCircuit(3, 3)
-    qc_ghz_phase.h(0)
-    qc_ghz_phase.cx(0, 1)
-    qc_ghz_phase.cx(0, 2)
+    qc_ghz_phase = qc_ghz_core.copy()
     qc_ghz_phase.z(0)
-    qc_ghz_phase.h([0, 1, 2])
-    qc_ghz_phase.measure([0, 1, 2], [0, 1, 2])
+    apply_h_layer(qc_ghz_phase, 3)
 
     print("\n=== GHZ with a Z on qubit0, measured in X basis (reveals phase) ===")
     run_and_print(qc_ghz_phase, shots=2048)
 
 
-def run_show(qc, shots=1024, show_statevector=False):
+def run_show(qc, shots=1024, show_statevector=False, display=True):
     """
     Alternative helper to run and show quantum circuit results.
     
     Args:
-        qc: QuantumCircuit to execute
+        qc: QuantumCircuit to execute; if it has no measurements, every
+            qubit is measured
         shots: Number of measurement shots
         show_statevector: Whether to display statevector
+        display: Whether to plot the counts histogram
     
     Returns:
         Statevector if show_statevector=True, None otherwise
     """
-    counts = run_circuit_sampler(qc, shots=shots)
+    counts, sv = run_circuit_sampler_with_sv(qc, shots=shots)
     print("Counts:", counts)
-    plot_histogram(counts)
-    plt.show()
+    _show_histogram(counts, display=display)
 
     if show_statevector:
-        qc_nom = qc.remove_final_measurements(inplace=False)
-        sv = Statevector.from_instruction(qc_nom)
         print("Statevector (ordered |00..0> .. |11..1>):")
-        for i, amp in enumerate(sv.data):
-            if abs(amp) > 1e-10:  # Only show non-zero amplitudes
-                print(f"{i:0{qc.num_qubits}b} -> {amp}")
+        _print_amplitudes(sv, qc.num_qubits)
         return sv
     return None
 
@@ -195,43 +484,40 @@ def interference_experiments():
     # Part A: Single-qubit H then H
     print("\n--- Part A: Single-qubit H then H ---")
     print("Expected: H*H = Identity, so should measure |0> with ~100% probability")
-    qc1 = QuantumCircuit(1, 1)
+    qc1 = QuantumCircuit(1)
     qc1.h(0)
     qc1.h(0)
-    qc1.measure(0, 0)
     run_show(qc1, shots=1024, show_statevector=True)
 
-    H = (1 / np.sqrt(2)) * np.array([[1, 1], [1, -1]])
+    H = _HMAT.real
     print("\nH matrix:\n", H)
     print("\nH @ H (should be Identity):\n", np.round(H.dot(H), 10))
 
     # Part B: Two-qubit interference
     print("\n--- Part B: Two-qubit interference (phase flip effect) ---")
 
+    # Every variant starts from H on both qubits (no measurements)
+    qc2_prefix = QuantumCircuit(2)
+    qc2_prefix.h([0, 1])
+
     # Baseline (no phase)
-    qc2_base = QuantumCircuit(2, 2)
-    qc2_base.h([0, 1])
+    qc2_base = qc2_prefix.copy()
     qc2_base.h([0, 1])
-    qc2_base.measure([0, 1], [0, 1])
     print("\nBaseline (no phase) — expected result: mostly '00'")
     run_show(qc2_base, shots=2048, show_statevector=True)
 
     # With per-qubit Z phase
-    qc2_phase = QuantumCircuit(2, 2)
-    qc2_phase.h([0, 1])
+    qc2_phase = qc2_prefix.copy()
     qc2_phase.z(0)
     qc2_phase.z(1)
     qc2_phase.h([0, 1])
-    qc2_phase.measure([0, 1], [0, 1])
     print("\nWith per-qubit Z phase (affects interference) — expected pattern differs from baseline")
     run_show(qc2_phase, shots=2048, show_statevector=True)
 
     # With CZ phase flip
-    qc2_cz = QuantumCircuit(2, 2)
-    qc2_cz.h([0, 1])
+    qc2_cz = qc2_prefix.copy()
     qc2_cz.cz(0, 1)
     qc2_cz.h([0, 1])
-    qc2_cz.measure([0, 1], [0, 1])
     print("\nWith CZ phase flip on |11> — shows how a targeted phase changes interference")
     run_show(qc2_cz, shots=2048, show_statevector=True)
 
@@ -252,9 +538,7 @@ def cnot_demonstration():
 
     counts = run_circuit_sampler(qc, shots=1024)
     print("Counts:", counts)
-    plot_histogram(counts)
-    plt.title("CNOT Gate Demonstration")
-    plt.show()
+    _show_histogram(counts, "CNOT Gate Demonstration")
 
 
 def visualize_circuit_example():
@@ -274,25 +558,63 @@ def visualize_circuit_example():
     counts = run_circuit_sampler(qc, shots=1000)
     print("\nBell State Measurements:", counts)
     print("Expected: Equal probabilities for |00> and |11>")
-    plot_histogram(counts)
-    plt.title("Bell State Measurement")
-    plt.show()
+    _show_histogram(counts, "Bell State Measurement")
 
 
-def main():
-    """Run all quantum experiments."""
+# Experiments run by main(), in display order
+_EXPERIMENTS = [
+    "basic_hadamard_measurement",
+    "two_qubit_measurement",
+    "single_qubit_h_h_measurement",
+    "visualize_circuit_example",
+    "ghz_experiments",
+    "interference_experiments",
+    "cnot_demonstration",
+]
+
+
+def _runner(name):
+    """
+    Run one experiment in a worker process.
+
+    Plots are rendered with the Agg backend and saved under ./figs/<name>.
+
+    Args:
+        name: Name of an experiment function in this module
+
+    Returns:
+        Everything the experiment printed
+    """
+    global _FIGURE_NUMBERS
+    matplotlib.use('Agg')
+    os.environ["QUANTUM_FIGDIR"] = os.path.join("figs", name)
+    _FIGURE_NUMBERS = itertools.count(1)
+    output = io.StringIO()
+    with redirect_stdout(output):
+        globals()[name]()
+    return output.getvalue()
+
+
+def main(parallel=False):
+    """
+    Run all quantum experiments.
+
+    Args:
+        parallel: Run the experiments in a process pool and save plots to
+            ./figs instead of showing them
+    """
     print("=" * 70)
     print("     QUANTUM COMPUTING EXPERIMENTS WITH QISKIT")
     print("=" * 70)
     
     try:
-        basic_hadamard_measurement()
-        two_qubit_measurement()
-        single_qubit_h_h_measurement()
-        visualize_circuit_example()
-        ghz_experiments()
-        interference_experiments()
-        cnot_demonstration()
+        if parallel:
+            with ProcessPoolExecutor() as executor:
+                for output in executor.map(_runner, _EXPERIMENTS):
+                    print(output, end="")
+        else:
+            for name in _EXPERIMENTS:
+                globals()[name]()
         
         print("\n" + "=" * 70)
         print("     ALL EXPERIMENTS COMPLETED SUCCESSFULLY!")
@@ -304,4 +626,10 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Run the quantum computing experiments.")
+    parser.add_argument(
+        "--parallel",
+        action="store_true",
+        help="run experiments in worker processes and save plots to ./figs",
+    )
+    main(parallel=parser.parse_args().parallel)
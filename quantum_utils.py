@@ -2,10 +2,35 @@
 Custom quantum circuit utilities and helper functions.
 """
 
+import functools
+import math
+
 from qiskit import QuantumCircuit, ClassicalRegister
 from qiskit.quantum_info import Statevector
+import matplotlib.pyplot as plt
 import numpy as np
 
+from _jit_kernels import apply_cx, apply_cz, apply_h, apply_unitary, apply_x, apply_z
+
+
+_INV_SQRT2 = 1.0 / math.sqrt(2.0)
+_HMAT = _INV_SQRT2 * np.array([[1, 1], [1, -1]], dtype=np.complex128)
+
+# Reference amplitudes for |Φ+⟩ = (|00⟩ + |11⟩) / √2 and (|000⟩ + |111⟩) / √2
+BELL_PHI_PLUS = np.array([1, 0, 0, 1], dtype=np.complex128) * _INV_SQRT2
+GHZ3 = np.array([1, 0, 0, 0, 0, 0, 0, 1], dtype=np.complex128) * _INV_SQRT2
+
+# Amplitudes of the four states prepared by create_bell_state, keyed by variant
+BELL_STATES = {
+    'phi_plus': BELL_PHI_PLUS,
+    'phi_minus': np.array([1, 0, 0, -1], dtype=np.complex128) * _INV_SQRT2,
+    'psi_plus': np.array([0, 1, 1, 0], dtype=np.complex128) * _INV_SQRT2,
+    'psi_minus': np.array([0, -1, 1, 0], dtype=np.complex128) * _INV_SQRT2,
+}
+
+# H ⊗ H ⊗ ... ⊗ H on n qubits, precomputed for small registers
+HADAMARD_LAYER = {n: functools.reduce(np.kron, [_HMAT] * n) for n in range(1, 6)}
+
 
 def create_bell_state(variant='phi_plus'):
     """
@@ -45,6 +70,24 @@ def create_bell_state(variant='phi_plus'):
     return qc
 
 
+@functools.lru_cache(maxsize=32)
+def _w_state_rotations(n_qubits):
+    """
+    Compute the rotation sequence of the general W state construction.
+    
+    Args:
+        n_qubits: Number of qubits
+    
+    Returns:
+        Tuple of (angle, control, target); control is None for the initial RY
+    """
+    rotations = [(2 * math.acos(math.sqrt(1 / n_qubits)), None, 0)]
+    for i in range(1, n_qubits):
+        angle = 2 * math.acos(math.sqrt(1 / (n_qubits - i)))
+        rotations.append((angle, i - 1, i))
+    return tuple(rotations)
+
+
 def create_w_state(n_qubits=3):
     """
     Create a W state: |W⟩ = (|100...⟩ + |010...⟩ + ... + |00...1⟩) / √n
@@ -69,12 +112,11 @@ def create_w_state(n_qubits=3):
         qc.cx(2, 0)
     else:
         # General case - use recursive construction
-        angle = 2 * np.arccos(np.sqrt(1 / n_qubits))
-        qc.ry(angle, 0)
-        
-        for i in range(1, n_qubits):
-            angle = 2 * np.arccos(np.sqrt(1 / (n_qubits - i)))
-            qc.cry(angle, i - 1, i)
+        for angle, control, target in _w_state_rotations(n_qubits):
+            if control is None:
+                qc.ry(angle, target)
+            else:
+                qc.cry(angle, control, target)
     
     return qc
 
@@ -94,6 +136,37 @@ def create_superposition_state(n_qubits):
     return qc
 
 
+def superposition_statevector(n_qubits):
+    """
+    Build the equal-superposition statevector directly, without a circuit.
+    
+    Args:
+        n_qubits: Number of qubits
+    
+    Returns:
+        Statevector with amplitude 2^(-n/2) on every basis state
+    """
+    return Statevector(np.full(1 << n_qubits, 2.0 ** (-n_qubits / 2), dtype=np.complex128))
+
+
+def apply_h_layer(qc, n_qubits):
+    """
+    Apply a Hadamard to each of the first n_qubits as one fused unitary.
+    
+    Args:
+        qc: QuantumCircuit to modify
+        n_qubits: Number of qubits, starting from qubit 0, to apply H to
+    
+    Returns:
+        Modified QuantumCircuit
+    """
+    if n_qubits in HADAMARD_LAYER:
+        qc.unitary(HADAMARD_LAYER[n_qubits], range(n_qubits), label='H^n')
+    else:
+        qc.h(range(n_qubits))
+    return qc
+
+
 def measure_all(qc):
     """
     Add measurement operations to all qubits.
@@ -110,6 +183,114 @@ def measure_all(qc):
     return qc
 
 
+# Parameter-free gates that are their own inverse
+_SELF_INVERSE_GATES = {'h', 'x', 'y', 'z', 'cx', 'cy', 'cz', 'swap'}
+
+
+def simplify_circuit(qc):
+    """
+    Cancel adjacent pairs of identical self-inverse gates (H·H, X·X, CX·CX...).
+    
+    Args:
+        qc: QuantumCircuit to simplify
+    
+    Returns:
+        New QuantumCircuit with the cancelled pairs removed
+    """
+    ops = []
+    stacks = {q: [] for q in qc.qubits}
+    
+    for instruction in qc.data:
+        op = instruction.operation
+        qubits = instruction.qubits
+        if op.name in _SELF_INVERSE_GATES and not op.params and stacks[qubits[0]]:
+            k = stacks[qubits[0]][-1]
+            prev = ops[k]
+            if (prev.operation.name == op.name
+                    and prev.qubits == qubits
+                    and all(stacks[q] and stacks[q][-1] == k for q in qubits)):
+                # Both gates act on exactly the same wires with nothing in between
+                ops[k] = None
+                for q in qubits:
+                    stacks[q].pop()
+                continue
+        ops.append(instruction)
+        for q in qubits:
+            stacks[q].append(len(ops) - 1)
+    
+    simplified = qc.copy_empty_like()
+    for instruction in ops:
+        if instruction is not None:
+            simplified.append(instruction.operation, instruction.qubits, instruction.clbits)
+    return simplified
+
+
+# Gates simulate_native can apply directly, keyed by instruction name
+_NATIVE_KERNELS = {
+    'h': apply_h,
+    'x': apply_x,
+    'z': apply_z,
+    'cx': apply_cx,
+    'cz': apply_cz,
+}
+
+
+def supports_native(qc):
+    """
+    Check whether simulate_native can handle every instruction in a circuit.
+    
+    Args:
+        qc: QuantumCircuit to inspect
+    
+    Returns:
+        True if the circuit only contains barriers, natively supported gates
+        and full-register unitaries
+    """
+    all_qubits = list(range(qc.num_qubits))
+    for instruction in qc.data:
+        name = instruction.operation.name
+        if name == 'unitary':
+            # Only unitaries spanning the whole register in order are supported
+            if [qc.find_bit(q).index for q in instruction.qubits] != all_qubits:
+                return False
+        elif name not in _NATIVE_KERNELS and name != 'barrier':
+            return False
+    return True
+
+
+def simulate_native(qc):
+    """
+    Simulate a circuit with the compiled kernels in _jit_kernels.
+    
+    Args:
+        qc: Measurement-free QuantumCircuit accepted by supports_native
+    
+    Returns:
+        Statevector of the circuit
+    """
+    n = qc.num_qubits
+    state = np.zeros(1 << n, dtype=np.complex128)
+    state[0] = 1.0
+    
+    for instruction in qc.data:
+        name = instruction.operation.name
+        if name == 'barrier':
+            continue
+        if name == 'unitary':
+            matrix = np.asarray(instruction.operation.params[0], dtype=np.complex128)
+            apply_unitary(state, matrix)
+            continue
+        kernel = _NATIVE_KERNELS.get(name)
+        if kernel is None:
+            raise ValueError(f"Gate '{name}' is not supported by simulate_native")
+        qubits = [qc.find_bit(q).index for q in instruction.qubits]
+        kernel(state, *qubits, n)
+    
+    if qc.global_phase:
+        state *= np.exp(1j * float(qc.global_phase))
+    return Statevector(state)
+
+
 def print_statevector(sv, threshold=1e-10):
     """
     Pretty print a statevector.
@@ -118,22 +299,51 @@ def print_statevector(sv, threshold=1e-10):
         sv: Statevector object
         threshold: Minimum amplitude to display
     """
-    n_qubits = int(np.log2(len(sv.data)))
+    data = np.asarray(sv.data)
+    n_qubits = int(np.log2(len(data)))
     print(f"Statevector ({n_qubits} qubits):")
     
-    for i, amp in enumerate(sv.data):
-        if abs(amp) > threshold:
-            basis = f"|{i:0{n_qubits}b}⟩"
-            phase = np.angle(amp)
-            magnitude = abs(amp)
-            
-            if abs(phase) < threshold:
-                print(f"  {basis}: {magnitude:.4f}")
-            else:
-                print(f"  {basis}: {magnitude:.4f} * e^(i*{phase:.4f})")
+    magnitudes = np.abs(data)
+    idx = np.nonzero(magnitudes > threshold)[0]
+    magnitudes = magnitudes[idx]
+    phases = np.angle(data[idx])
+    has_phase = np.abs(phases) >= threshold
+    
+    lines = []
+    for i, magnitude, phase, show_phase in zip(idx, magnitudes, phases, has_phase):
+        basis = f"|{i:0{n_qubits}b}⟩"
+        if not show_phase:
+            lines.append(f"  {basis}: {magnitude:.4f}")
+        else:
+            lines.append(f"  {basis}: {magnitude:.4f} * e^(i*{phase:.4f})")
+    if lines:
+        print("\n".join(lines))
+
+
+def _fast_histogram(counts, title=None):
+    """
+    Draw measurement counts as a plain bar chart.
+    
+    A lightweight stand-in for qiskit's plot_histogram for the handful of
+    outcomes produced by small circuits.
+    
+    Args:
+        counts: Dictionary of measurement counts
+        title: Optional plot title
+    
+    Returns:
+        matplotlib Figure containing the chart
+    """
+    labels = sorted(counts)
+    fig, ax = plt.subplots()
+    ax.bar(labels, [counts[label] for label in labels])
+    ax.set_ylabel("Count")
+    if title:
+        ax.set_title(title)
+    return fig
 
 
-def compare_circuits(qc1, qc2, label1="Circuit 1", label2="Circuit 2"):
+def compare_circuits(qc1, qc2, label1="Circuit 1", label2="Circuit 2", verbose=True):
     """
     Compare two quantum circuits by computing their statevectors.
     
@@ -142,6 +352,7 @@ def compare_circuits(qc1, qc2, label1="Circuit 1", label2="Circuit 2"):
         qc2: Second QuantumCircuit
         label1: Label for first circuit
         label2: Label for second circuit
+        verbose: Whether to print both statevectors and the fidelity
     
     Returns:
         Boolean indicating if circuits are equivalent
@@ -150,21 +361,58 @@ def compare_circuits(qc1, qc2, label1="Circuit 1", label2="Circuit 2"):
     sv2 = Statevector.from_instruction(qc2)
     
     # Check if statevectors are equal (up to global phase)
-    fidelity = abs(np.dot(np.conj(sv1.data), sv2.data))
+    fidelity = abs(np.vdot(sv1.data, sv2.data))
     
-    print(f"\n{label1}:")
-    print_statevector(sv1)
-    print(f"\n{label2}:")
-    print_statevector(sv2)
-    print(f"\nFidelity: {fidelity:.6f}")
+    if verbose:
+        print(f"\n{label1}:")
+        print_statevector(sv1)
+        print(f"\n{label2}:")
+        print_statevector(sv2)
+        print(f"\nFidelity: {fidelity:.6f}")
     
     return np.isclose(fidelity, 1.0)
 
 
+# Diagonal sign of each single-qubit Pauli in the computational basis
+_PAULI_SIGNS = {
+    'I': np.array([1, 1]),
+    'X': np.array([1, 1]),
+    'Y': np.array([1, -1]),
+    'Z': np.array([1, -1]),
+}
+
+
+@functools.lru_cache(maxsize=128)
+def _pauli_action(pauli_string):
+    """
+    Precompute how a Pauli string acts on computational basis amplitudes.
+    
+    Args:
+        pauli_string: String of 'I', 'X', 'Y', 'Z' (leftmost is the highest qubit)
+    
+    Returns:
+        Tuple (perm, factors) such that (P @ psi) == factors * psi[perm]
+    """
+    n = len(pauli_string)
+    x_mask = 0
+    for position, char in enumerate(pauli_string):
+        if char in 'XY':
+            x_mask |= 1 << (n - 1 - position)
+    
+    # Z-type signs of the source index, times i for every Y (Y = iXZ)
+    signs = functools.reduce(np.kron, [_PAULI_SIGNS[char] for char in pauli_string])
+    perm = np.arange(1 << n) ^ x_mask
+    factors = (1j ** pauli_string.count('Y')) * signs[perm]
+    return perm, factors
+
+
 def get_pauli_expectation(state, pauli_string):
     """
     Calculate expectation value of a Pauli string on a quantum state.
     
+    Strings of up to 3 qubits on a Statevector are evaluated directly from
+    the amplitudes; anything else goes through qiskit's Pauli operator.
+    
     Args:
         state: Statevector
         pauli_string: String of Pauli operators (e.g., 'XYZ')
@@ -172,6 +420,14 @@ def get_pauli_expectation(state, pauli_string):
     Returns:
         Expectation value
     """
+    if (isinstance(state, Statevector)
+            and 0 < len(pauli_string) <= 3
+            and len(pauli_string) == state.num_qubits
+            and set(pauli_string) <= set('IXYZ')):
+        perm, factors = _pauli_action(pauli_string)
+        data = state.data
+        return np.vdot(data, factors * data[perm]).real
+    
     from qiskit.quantum_info import Pauli
     
     pauli_op = Pauli(pauli_string)
@@ -81,7 +81,7 @@ def run_quick_test():
     try:
         from test_quantum import run_all_tests
         
-        # Suppress output during test
+        # Suppress output during test (run_all_tests disables plots itself)
         import io
         from contextlib import redirect_stdout
         